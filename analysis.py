@@ -1,12 +1,12 @@
 import folium
+from folium.plugins import FastMarkerCluster
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import math
-import json
-import re
 import seaborn as sns
 
+from cleaning import ALL_SKILLS, SKILL_LIST
+
 
 def calculate_skill_match(df: pd.DataFrame, skills: list[str]) -> pd.DataFrame:
     """
@@ -23,28 +23,34 @@ def calculate_skill_match(df: pd.DataFrame, skills: list[str]) -> pd.DataFrame:
     >>> test_result = calculate_skill_match(test_df, test_skills)[['skills', 'skill_match']]
     >>> expected_test_result = pd.DataFrame({'skills': ['Python, SQL, Java', 'Python, SQL', 'Java, C++'], 'skill_match': [33.33, 50.00, 0.00]})
     >>> pd.testing.assert_frame_equal(test_result, expected_test_result)
+    >>> calculate_skill_match(pd.DataFrame({'skills': [np.nan, np.nan]}), test_skills)['skill_match'].tolist()
+    [nan, nan]
     """
     # Convert to set
     try:
         skills_set = set(skills)
     except TypeError:
         raise TypeError("skills should be a list")
-    skill_matches = []
-    for job_skills in df['skills']:
-        if pd.notna(job_skills):
-            try:
-                job_skills_set = set(job_skills.split(', '))
-            except AttributeError:
-                raise TypeError("skills should be separated by a comma and space")
-
-            # Calculate the percentage 
-            match_percent = round((len(job_skills_set & skills_set) / len(job_skills_set)) * 100, 2)
-            skill_matches.append(match_percent)
-        else:
-            skill_matches.append(np.nan)
-
-    # Add the 'skill_match' column to the original dataframe
-    df_with_match = df.copy()
+
+    # Job postings often share the same skills string, so only the distinct strings are matched
+    unique_skills = pd.Series(df['skills'].dropna().unique(), dtype=object)
+
+    # One row per (distinct skills string, skill)
+    try:
+        job_skills = unique_skills.str.split(', ').explode()
+    except AttributeError:
+        raise TypeError("skills should be separated by a comma and space")
+
+    # Calculate the percentage
+    job_skill_counts = job_skills.groupby(level=0, sort=False).nunique()
+    matched_counts = job_skills[job_skills.isin(skills_set)].groupby(level=0, sort=False).nunique()
+    matched_counts = matched_counts.reindex(job_skill_counts.index, fill_value=0)
+    match_percent = (matched_counts / job_skill_counts * 100).round(2)
+    match_percent.index = unique_skills[match_percent.index]
+    skill_matches = df['skills'].map(match_percent)
+
+    # Add the 'skill_match' column to a shallow copy, the existing columns are shared and not copied
+    df_with_match = df.copy(deep=False)
     df_with_match['skill_match'] = skill_matches
 
     return df_with_match
@@ -95,59 +101,26 @@ def top_skills(data: pd.DataFrame, n: int) -> pd.DataFrame:
     >>> test_result = top_skills(test_df, 3)
     >>> expected_df = pd.DataFrame.from_dict({'python': 2, 'sql': 2, 'java': 1}, orient='index', columns=['count'])
     >>> pd.testing.assert_frame_equal(test_result, expected_df)
+
+    >>> len(top_skills(test_df, 100))
+    5
+    >>> top_skills(test_df, 112)
+    Traceback (most recent call last):
+    ...
+    ValueError: n cannot be greater than the number of all of the skills
     """
     if n <= 0:
         raise ValueError("n must be a positive integer")
- 
-    # Create a dictionary to count the occurrences of each skill
-    skill_counts = {}
-    # Utilised chatgpt to remove generic terms from skills.unique like computer, engineering, which were not real skills but were occuring many times. Reference - https://chat.openai.com/
-    all_skill_list = ['Azure AD',
-                      '.net', ' oauth', ' valet key', ' api', ' azure AD',
-                      'AAA game engine experience', ' C/C++ programming', ' BS CS/CE',
-                      'Azure', ' Active Directory',
-                      'SSO', ' SAML', ' OAuth', ' OpenID',
-                      'Window', ' AD', ' SCCM', ' ServiceNow', ' IT infrastructure', ' DHCP', ' DNS',
-                      'Python', ' PHP', ' MySQL', ' SDLC',
-                      'ASP', ' .NET', ' SQL',
-                      'JavaScript', ' HTML', ' SQL', ' .Net', ' C#', ' CSS', ' J2EE', ' Java',
-                      'Research', ' Test', ' A/V', ' Assembly', ' Python', ' Perl', ' Bash', ' JavaScript', ' Java',
-                      ' PHP', ' Windows', ' UNIX', ' Linux', ' Excel', ' PowerPoint', ' SAS',
-                      'Oracle', ' MySQL', ' SQL',
-                      'IT', ' Biometrics', ' DNA', ' Project Manager', ' SDLC', ' Test', ' J2EE', ' C#',
-                      'Automotive', ' API', ' Ruby on Rails', ' Swift', ' Kotlin', ' Release', ' Java', ' API',
-                      ' MySQL', ' Apache', ' Unity', ' Unreal Engine', ' OpenGL', ' DirectX',
-                      'Machine Learning', ' Deep Learning', ' Natural Language Processing', ' Computer Vision',
-                      ' Data Science', ' Big Data', ' Hadoop', ' Spark', ' Cassandra', ' MongoDB', ' Elasticsearch',
-                      ' Redis', ' RabbitMQ',
-                      'Git', ' Jenkins', ' Ansible', ' Puppet', ' Chef', ' Nagios', ' New Relic', ' Splunk', ' Grafana',
-                      ' Prometheus', ' ELK Stack', ' Apache Kafka',
-                      'RESTful APIs', ' GraphQL', ' WebSockets', ' OAuth 2.0', ' OpenID Connect', ' SAML 2.0', ' JWT',
-                      'OAuth2/OIDC libraries']
-    all_skill_list = list(map(lambda x: x.strip().lower(), all_skill_list))
-    
-    if n > len(all_skill_list):
+
+    # Bounded by the listed skills, repeated entries included
+    if n > len(SKILL_LIST):
         raise ValueError("n cannot be greater than the number of all of the skills")
-  
-    # Loop over each job listing and count the number of occurrences of each skill
-    for skills in data['skills']:
-        if pd.isna(skills):
-            continue
-        skill_list = list(map(lambda x: x.strip().lower(), skills.split(', ')))
-        for skill in skill_list:
-            if skill in all_skill_list:
-                if skill in skill_counts:
-                    skill_counts[skill] += 1
-                else:
-                    skill_counts[skill] = 1
-            else:
-                continue
-    # Create a DataFrame from the dictionary of skill counts
-    skill_df = pd.DataFrame.from_dict(skill_counts, orient='index', columns=['count'])
-
-    skill_df = skill_df.sort_values(by='count', ascending=False)
-
-    return skill_df.head(n)
+
+    # Split every job listing into its skills and count the occurrences of each known skill
+    skills = data['skills'].dropna().str.split(',').explode().str.strip().str.lower()
+    skill_counts = skills[skills.isin(ALL_SKILLS)].value_counts(sort=False).nlargest(n)
+
+    return skill_counts.rename('count').to_frame()
 
 
 def jobs_by_state(df: pd.DataFrame) -> pd.DataFrame:
@@ -162,42 +135,50 @@ def jobs_by_state(df: pd.DataFrame) -> pd.DataFrame:
     >>> result = jobs_by_state(df)
     >>> expected_result = pd.DataFrame({'state':['CA', 'NY'], 'title':['Engineer', 'Manager'], 'counts':[2, 2]})
     >>> pd.testing.assert_frame_equal(expected_result, result)
+
+    >>> jobs_by_state(pd.DataFrame({'state':['CA', 'CA', 'CA', 'CA'], 'title':['Engineer', 'Analyst', 'Engineer', 'Analyst']}))
+      state    title  counts
+    0    CA  Analyst       2
+    >>> jobs_by_state(pd.DataFrame({'state':['CA', 'CA', 'CA', 'CA'], 'title':['Analyst', 'Engineer', 'Analyst', 'Engineer']}))
+      state    title  counts
+    0    CA  Analyst       2
     """
     if 'state' not in df.columns or 'title' not in df.columns:
         raise ValueError("df should contain 'state' and 'title' columns")
-    state_job_counts = df.groupby(['state', 'title']).size()
-    state_job_counts = state_job_counts.reset_index()
-    state_job_counts = state_job_counts.rename(columns={0: 'counts'})
-    max_counts_index = state_job_counts.groupby('state')['counts'].idxmax()
-    max_job_titles = state_job_counts.loc[max_counts_index]
-    max_job_titles = max_job_titles.reset_index()
-    max_job_titles = max_job_titles.drop('index', axis=1)
-    return max_job_titles
+    state_job_counts = df.groupby(['state', 'title'], sort=False, observed=True).size()
+    # idxmax keeps the first of tied titles, sort the small counts by title so ties go to the first title in order
+    state_job_counts = state_job_counts.sort_index(level='title')
+    max_counts_index = state_job_counts.groupby(level='state', sort=False, observed=True).idxmax()
+    max_job_titles = state_job_counts.loc[max_counts_index].rename('counts').reset_index()
+    # sort=False leaves the states in order of appearance, sort the few result rows by state instead
+    return max_job_titles.sort_values('state', key=lambda state: state.astype(str), ignore_index=True)
 
 
 def create_job_map(df: pd.DataFrame) -> folium.Map:
     """
-    Creates a map using the given dataset, with markers for each job posting location.
+    Creates a map using the given dataset, with clustered markers for each job posting location.
     Returns a folium Map object containing the markers.
 
     :param df: pd.DataFrame: the dataset containing job postings and their corresponding locations
-    :return: folium.Map: a folium Map object with markers for each job posting location
+    :return: folium.Map: a folium Map object with clustered markers for each job posting location
     """
     # Reference - https://towardsdatascience.com/creating-a-simple-map-with-folium-and-python-4c083abfff94
     map_center = [40.7831, -73.9712]  # Example center point in New York City
 
     map = folium.Map(location=map_center, zoom_start=10)
 
-    # Iterate over rows in dataset and add markers to the map
-    for index, row in df.iterrows():
-        lat = row['latitude']
-        long = row['longitude']
-        job_title = row['title']
-        company_name = row['company']
-        salary = row['mean_salary']
-        popup_html = f"<b>{job_title}</b><br>{company_name}<br>{salary}"
-
-        folium.Marker(location=[lat, long], popup=popup_html).add_to(map)
+    # Markers are clustered and only created in the browser when their cluster is expanded
+    marker_callback = """
+    function (row) {
+        var marker = L.marker(new L.LatLng(row[0], row[1]));
+        marker.bindPopup(row[2]);
+        return marker;
+    }
+    """
+    columns = [df[col].to_numpy() for col in ['latitude', 'longitude', 'title', 'company', 'mean_salary']]
+    marker_data = [[lat, long, f"<b>{job_title}</b><br>{company_name}<br>{salary}"]
+                   for lat, long, job_title, company_name, salary in zip(*columns)]
+    FastMarkerCluster(data=marker_data, callback=marker_callback).add_to(map)
     return map
 
 
@@ -211,7 +192,7 @@ def plot_salary_distribution(df: pd.DataFrame, job_title: str) -> None:
         raise ValueError("df should contain 'mean_salary' and 'title' columns")
         
     df_salary_plot = df[df['mean_salary'].notnull() & df['title'].notnull()]
-    matching_titles = df_salary_plot[df_salary_plot['title'].str.contains(job_title, case=False)]['title'].unique()
+    matching_titles = df_salary_plot[df_salary_plot['title'].str.lower().str.contains(job_title.lower(), regex=False)]['title'].unique()
 
     if len(matching_titles) == 0:
         print("No matching job titles found.")
@@ -228,11 +209,12 @@ def plot_salary_distribution(df: pd.DataFrame, job_title: str) -> None:
 
     # Calculate median salary for each state
     #     state_median_salary = df.groupby('state')['median_salary'].median().reset_index()
-    state_median_salary = df.loc[df['title'].isin(matching_titles)].groupby('state')[
-        'mean_salary'].median().reset_index()
+    state_median_salary = df.loc[df['title'].isin(matching_titles)].groupby('state', sort=False, observed=True)[
+        'mean_salary'].median().reset_index().sort_values('state', key=lambda state: state.astype(str))
     # Plot the distribution of median salaries across different regions
     plt.figure(figsize=(16, 9))
-    sns.barplot(x='state', y='mean_salary', data=state_median_salary, color='midnightblue')
+    sns.barplot(x='state', y='mean_salary', data=state_median_salary, order=state_median_salary['state'],
+                color='midnightblue')
     plt.title('Mean Salary by State')
     plt.xlabel('State')
     plt.ylabel('Mean Salary ($)')
@@ -249,31 +231,32 @@ def calculate_adjusted_salary(job_df: pd.DataFrame, cli_df: pd.DataFrame, cli_st
     :param city: string: city against which to calculate the mean salary
 
     >>> test_cli_df = pd.DataFrame({'city': ['Chicago', 'New York', 'San Fransisco'], 'state':['IL', 'NY', 'CA'], 'cost_of_living_index': [100, 130, 120]})
-    >>> test_state_df = pd.DataFrame({'state': ['NC', 'sOH'], 'cost_of_living_index': [90, 70]})
+    >>> test_state_df = pd.DataFrame({'state': ['NC', 'OH'], 'cost_of_living_index': [90, 70]})
     >>> test_job_df = pd.DataFrame({'city': ['Chicago', 'New York', 'Charlotte', 'Columbus'], 'state': ['IL', 'NY', 'NC', 'OH'], 'mean_salary': [100000, 150000, 80000, 75000]})
     >>> test_result = calculate_adjusted_salary(test_job_df, test_cli_df, test_state_df, 'Chicago, IL')
     >>> expected_df = pd.DataFrame({'city': ['Chicago', 'New York', 'Charlotte', 'Columbus'], 'state': ['IL', 'NY', 'NC', 'OH'], 'mean_salary': [100000, 150000, 80000, 75000], 'adjusted_salary': [100000.0, 115384.62, 88888.89, 107142.86]})
     >>> pd.testing.assert_frame_equal(test_result, expected_df)
     """
     df = job_df.copy()
-    df['city_state'] = df.city.str.cat(df.state, sep=', ')
-    cli_df['city_state'] = cli_df.city.str.cat(cli_df.state, sep=', ')
-    ref_cli = float(cli_df.loc[cli_df.city_state == city, 'cost_of_living_index'])
-    for idx, job in df.iterrows():
-        if pd.notna(job.mean_salary) and cli_df.city_state.str.contains('^'+job['city_state']+'$', regex=True).any():
-            city_cli = float(cli_df.loc[cli_df.city_state == job['city_state'], 'cost_of_living_index'])
-            df.loc[idx, 'adjusted_salary'] = round(df.loc[idx, 'mean_salary']/(city_cli / ref_cli), 2)
-        elif pd.notna(job.mean_salary) and cli_state_df.state.str.contains('^'+job['state']+'$', regex=True).any():
-            state_cli = float(cli_state_df.loc[cli_state_df.state == job['state'], 'cost_of_living_index'])
-            df.loc[idx, 'adjusted_salary'] = round(df.loc[idx, 'mean_salary']/(state_cli / ref_cli), 2)
-        else:
-            df.loc[idx, 'adjusted_salary'] = np.nan
-    return df.drop('city_state', axis=1)
+    city_to_cli = dict(zip(cli_df.city.str.cat(cli_df.state, sep=', '), cli_df.cost_of_living_index))
+    state_to_cli = dict(zip(cli_state_df.state, cli_state_df.cost_of_living_index))
+    if city not in city_to_cli:
+        raise ValueError(f"cost of living index not found for {city}")
+    ref_cli = city_to_cli[city]
+
+    # Look up the city index of every job, falling back to the index of its state
+    city_cli = df.city.str.cat(df.state, sep=', ').map(city_to_cli).to_numpy(dtype=float)
+    state_cli = df.state.map(state_to_cli).to_numpy(dtype=float)
+    job_cli = np.where(np.isnan(city_cli), state_cli, city_cli)
+
+    df['adjusted_salary'] = np.round(df['mean_salary'].to_numpy(dtype=float) / (job_cli / ref_cli), 2)
+    return df
 
 
 def skill_co_occ(connecting_df: pd.DataFrame) -> pd.DataFrame:
     """
     Produces a pandas DataFrame with the frequency of co-occurrence of each pair of skills in the job postings.
+    A skill listed more than once in the same job posting is counted once, so every pair adds at most one per job.
 
     :param connecting_df: DataFrame: dataset containing job index with the required skill
     :return: DataFrame: dataset containing the frequency of co-occurrence of each pair of skills in the job postings
@@ -282,14 +265,24 @@ def skill_co_occ(connecting_df: pd.DataFrame) -> pd.DataFrame:
     >>> test_result = skill_co_occ(connecting_df_test)
     >>> expected_df = pd.DataFrame({'skill_x': ['python', 'java', 'java'], 'skill_y': ['sql', 'python', 'sql'], 'job_id': [2, 1, 1]})
     >>> pd.testing.assert_frame_equal(test_result, expected_df)
+    >>> skill_co_occ(pd.DataFrame({'job_id': [0, 0, 0], 'skill': ['sql', 'python', 'sql']}))
+      skill_x skill_y  job_id
+    0  python     sql       1
     """
 
-    jobs_grouped = connecting_df.groupby('job_id')
-    job_skills_cross = jobs_grouped.apply(lambda x: pd.merge(x, x, how='cross'))
-    job_skills_cross.reset_index(inplace=True)
-    job_skills_cross.drop(['job_id_x', 'job_id_y', 'level_1'], axis=1, inplace=True)
-    job_skills_cross = job_skills_cross.loc[~(job_skills_cross['skill_x'] == job_skills_cross['skill_y']), :]
-    skill_coocc = job_skills_cross.groupby(['skill_x', 'skill_y']).agg('count').reset_index().\
-        sort_values('job_id', ascending=False)
-    skill_coocc = skill_coocc.loc[skill_coocc['skill_x'] < skill_coocc['skill_y'], :]
-    return skill_coocc.reset_index().drop('index', axis=1)
+    # Integer codes for every distinct (job, skill) pair, skills coded in sorted order
+    job_skills = connecting_df[['job_id', 'skill']].drop_duplicates()
+    skills, skill_codes = np.unique(job_skills['skill'].to_numpy(dtype=str), return_inverse=True)
+    coded = pd.DataFrame({'job': pd.factorize(job_skills['job_id'])[0], 'skill': skill_codes})
+
+    # Every pair of skills within the same job (skill_x < skill_y), counted by a single pair id
+    pairs = coded.merge(coded, on='job')
+    pairs = pairs.loc[pairs['skill_x'] < pairs['skill_y'], :]
+    pair_ids, counts = np.unique(pairs['skill_x'].to_numpy() * len(skills) + pairs['skill_y'].to_numpy(),
+                                 return_counts=True)
+
+    skill_coocc = pd.DataFrame({'skill_x': skills[pair_ids // len(skills)].astype(object),
+                                'skill_y': skills[pair_ids % len(skills)].astype(object),
+                                'job_id': counts.astype(np.int64)})
+    skill_coocc = skill_coocc.sort_values('job_id', ascending=False, kind='stable')
+    return skill_coocc.reset_index(drop=True)
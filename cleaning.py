@@ -1,6 +1,57 @@
+import numpy as np
 import pandas as pd
-import math
 import re
+from functools import lru_cache
+
+_DIGIT_RE = re.compile(r'\d')
+# A number followed by an optional 'k' (thousand) or 'm' (million) suffix
+_SALARY_RE = re.compile(r'(\d+(?:\.\d+)?)([km]?)')
+_UNIT_FACTORS = {'': 1, 'k': 1000, 'm': 1_000_000}
+
+_HOURLY_KEYWORDS = ['hr', 'hourly', 'hour']
+_MONTHLY_KEYWORDS = ['monthly', 'mo', 'month']
+_YEARLY_KEYWORDS = ['yearly', 'annual', 'annum', 'year', 'yr']
+_WEEKLY_KEYWORDS = ['week', 'weekly']
+
+_FREQUENCIES = ['hourly', 'weekly', 'monthly', 'yearly']
+_HOURS_PER_YEAR = 40 * 4 * 12  # 40 hours a week, 4 weeks a month
+# Factor that turns a salary paid at the given frequency into an annual compensation
+_FREQ_MULT = {'hourly': _HOURS_PER_YEAR, 'weekly': 4 * 12, 'monthly': 12, 'yearly': 1}
+
+# One lookahead per frequency, tried in this order from the start of the string. The first frequency with a keyword
+# anywhere in the salary string wins and is the name of the group that matched. Keywords match in any case, so the
+# row-wise and column-wise parsers agree whether or not the salary string was lowercased first.
+_FREQUENCY_RE = re.compile('|'.join(f"(?=.*?(?P<{frequency}>{'|'.join(map(re.escape, keywords))}))"
+                                    for frequency, keywords in [('hourly', _HOURLY_KEYWORDS),
+                                                                ('yearly', _YEARLY_KEYWORDS),
+                                                                ('monthly', _MONTHLY_KEYWORDS),
+                                                                ('weekly', _WEEKLY_KEYWORDS)]),
+                           re.DOTALL | re.IGNORECASE)
+
+# Utilised chatgpt to remove generic terms from skills.unique like computer, engineering, which were not real skills but were occuring many times. Reference - https://chat.openai.com/
+SKILL_LIST = ['Azure AD',
+              '.net', ' oauth', ' valet key', ' api', ' azure AD',
+              'AAA game engine experience', ' C/C++ programming', ' BS CS/CE',
+              'Azure', ' Active Directory',
+              'SSO', ' SAML', ' OAuth', ' OpenID',
+              'Window', ' AD', ' SCCM', ' ServiceNow', ' IT infrastructure', ' DHCP', ' DNS',
+              'Python', ' PHP', ' MySQL', ' SDLC',
+              'ASP', ' .NET', ' SQL',
+              'JavaScript', ' HTML', ' SQL', ' .Net', ' C#', ' CSS', ' J2EE', ' Java',
+              'Research', ' Test', ' A/V', ' Assembly', ' Python', ' Perl', ' Bash', ' JavaScript', ' Java',
+              ' PHP', ' Windows', ' UNIX', ' Linux', ' Excel', ' PowerPoint', ' SAS',
+              'Oracle', ' MySQL', ' SQL',
+              'IT', ' Biometrics', ' DNA', ' Project Manager', ' SDLC', ' Test', ' J2EE', ' C#',
+              'Automotive', ' API', ' Ruby on Rails', ' Swift', ' Kotlin', ' Release', ' Java', ' API',
+              ' MySQL', ' Apache', ' Unity', ' Unreal Engine', ' OpenGL', ' DirectX',
+              'Machine Learning', ' Deep Learning', ' Natural Language Processing', ' Computer Vision',
+              ' Data Science', ' Big Data', ' Hadoop', ' Spark', ' Cassandra', ' MongoDB', ' Elasticsearch',
+              ' Redis', ' RabbitMQ',
+              'Git', ' Jenkins', ' Ansible', ' Puppet', ' Chef', ' Nagios', ' New Relic', ' Splunk', ' Grafana',
+              ' Prometheus', ' ELK Stack', ' Apache Kafka',
+              'RESTful APIs', ' GraphQL', ' WebSockets', ' OAuth 2.0', ' OpenID Connect', ' SAML 2.0', ' JWT',
+              'OAuth2/OIDC libraries']
+ALL_SKILLS = frozenset(skill.strip().lower() for skill in SKILL_LIST)
 
 
 def detect_number(x: str) -> bool:
@@ -18,10 +69,7 @@ def detect_number(x: str) -> bool:
     False
     """
     try:
-        pattern = re.compile(r'^.*\d.*$')
-        if re.match(pattern, x) is None:
-            return False
-        return True
+        return _DIGIT_RE.search(x) is not None
     except TypeError:
         print("Input value is not a string")
 
@@ -43,21 +91,15 @@ def find_salary(salary_string: str) -> list[float]:
     [456000000.0, 678000000.0]
     >>> find_salary('$456.67-678.56')
     [456.67, 678.56]
+    >>> find_salary('10k-10')
+    [10000.0, 10.0]
+    >>> find_salary('$(50,000)')
+    [50000.0]
     """
     try:
         salary_string = salary_string.lower().replace(',', '')
-        pattern = re.compile(r'[\d(\.\d)?]+')
-        salaries = re.findall(pattern, salary_string)
-        for idx in range(len(salaries)):
-            check_idx = salary_string.index(salaries[idx]) + len(salaries[idx])
-            if check_idx == len(salary_string) or not (salary_string[check_idx] in ['k', 'm']):
-                salaries[idx] = round(float(salaries[idx]), 2)
-            elif salary_string[check_idx] == 'k':  # For example - 100k meaning 100000 (k=1000)
-                salaries[idx] = round(float(salaries[idx]) * 1000, 2)
-            elif salary_string[check_idx] == 'm':  # For example 1m meaning 1000000 (m= million)
-                salaries[idx] = round(float(salaries[idx]) * math.pow(10, 6), 2)
-
-        return salaries
+        # For example - 100k meaning 100000 (k=1000) and 1m meaning 1000000 (m= million)
+        return [round(float(number) * _UNIT_FACTORS[unit], 2) for number, unit in _SALARY_RE.findall(salary_string)]
     except TypeError:
         print("Input value is not a string")
         return []
@@ -83,28 +125,18 @@ def determine_payment_frequency(salary_string: str, salaries: list[float]) -> st
     'monthly'
     >>> determine_payment_frequency('$50k', [50000.00])
     'yearly'
+    >>> determine_payment_frequency('$60000 - $75', [60000.00, 75.00])
+    'monthly'
+    >>> determine_payment_frequency('$10', [10.00, 60000.00, 20.00])
+    'monthly'
     """
     if not salary_string:
         raise ValueError("salary_string is empty")
     if not salaries:
         raise ValueError("salaries list is empty")
-    frequency = None
-    hourly = ['hr', 'hourly', 'hour']
-    monthly = ['monthly', 'mo', 'month']
-    yearly = ['yearly', 'annual', 'annum', 'year', 'yr']
-    weekly = ['week', 'weekly']
-    for i in hourly:
-        if i in salary_string:
-            return 'hourly'
-    for i in yearly:
-        if i in salary_string:
-            return 'yearly'
-    for i in monthly:
-        if i in salary_string:
-            return 'monthly'
-    for i in weekly:
-        if i in salary_string:
-            return 'weekly'
+    frequency_match = _FREQUENCY_RE.match(salary_string)
+    if frequency_match:
+        return frequency_match.lastgroup
     if max(salaries) <= 500:  # logical assumption
         return 'hourly'
     elif min(salaries) >= 35000:   # logical assumption
@@ -113,31 +145,93 @@ def determine_payment_frequency(salary_string: str, salaries: list[float]) -> st
         return 'monthly'
 
 
-def det_salary_range_and_frequency(salary_string: str) -> dict:
+@lru_cache(maxsize=65536)
+def det_salary_range_and_frequency(salary_string: str) -> tuple[float, float, str]:
     """
-    Extracts the minimum and maximum salary values and payment frequency from a given salary string.
+    Extracts the minimum and maximum salary values and payment frequency from a given salary string. Results are
+    cached per salary string, since scraped postings repeat the same salary text a lot.
 
     :param salary_string: str: string containing salary data
-    :return dictionary containing 'min_salary', 'max_salary', and 'frequency' as keys
+    :return tuple[float, float, str]: minimum salary, maximum salary and payment frequency
 
     >>> det_salary_range_and_frequency('$345k-$450k annual')
-    {'min_salary': 345000.0, 'max_salary': 450000.0, 'frequency': 'yearly'}
+    (345000.0, 450000.0, 'yearly')
     >>> det_salary_range_and_frequency('$345-$450 per week')
-    {'min_salary': 345.0, 'max_salary': 450.0, 'frequency': 'weekly'}
+    (345.0, 450.0, 'weekly')
     >>> det_salary_range_and_frequency('$15-$20')
-    {'min_salary': 15.0, 'max_salary': 20.0, 'frequency': 'hourly'}
+    (15.0, 20.0, 'hourly')
+    >>> det_salary_range_and_frequency('$60-$70/hr on c2c')
+    (60.0, 70.0, 'hourly')
+    >>> det_salary_range_and_frequency('$90000 Per Hour')
+    (90000.0, 90000.0, 'hourly')
+    >>> det_salary_range_and_frequency('$60,000 - $75')
+    (60000.0, 75.0, 'monthly')
     """
     try:
-        salaries = find_salary(salary_string)
-        if len(salaries) == 1:
-            salaries.append(salaries[0])
+        # A single number is both ends of the range
+        salaries = find_salary(salary_string)[:2]
         frequency = determine_payment_frequency(salary_string, salaries)
-        salaries.append(frequency)
-        d = {'min_salary': salaries[0], 'max_salary': salaries[1], 'frequency': salaries[2]}
-        return d
+        return salaries[0], salaries[-1], frequency
     except TypeError:
         print("Input value is not a string")
-        return {}
+        return ()
+
+
+def parse_salaries_column(salaries: pd.Series) -> pd.DataFrame:
+    """
+    Extracts the minimum and maximum salary values and payment frequency from a whole column of salary strings at
+    once. Gives the same values as calling det_salary_range_and_frequency on every row, but runs the regex over the
+    column in a single pass. Rows without any number are left as NaN.
+
+    :param salaries: pd.Series: column of strings containing salary data
+    :return: pd.DataFrame: dataframe with 'min_salary', 'max_salary' and 'frequency' columns, indexed like salaries
+
+    >>> parse_salaries_column(pd.Series(['$345k-$450k annual', '$345-$450 per week', '$15-$20', 'depends', None]))
+       min_salary  max_salary frequency
+    0    345000.0    450000.0    yearly
+    1       345.0       450.0    weekly
+    2        15.0        20.0    hourly
+    3         NaN         NaN       NaN
+    4         NaN         NaN       NaN
+    >>> parse_salaries_column(pd.Series(['$600 Weekly', '$90000 Per Hour', '$60,000 - $75']))
+       min_salary  max_salary frequency
+    0       600.0       600.0    weekly
+    1     90000.0     90000.0    hourly
+    2     60000.0        75.0   monthly
+    >>> parse_salaries_column(pd.Series(['depends', None]))
+       min_salary  max_salary frequency
+    0         NaN         NaN       NaN
+    1         NaN         NaN       NaN
+    """
+    salary_strings = salaries.reset_index(drop=True).fillna('').astype(str).str.lower().str.replace(',', '', regex=False)
+
+    # One row per number found, with the unit suffix that follows it
+    matches = salary_strings.str.extractall(_SALARY_RE)
+    units = matches[1].to_numpy()
+    unit_codes = np.where(units == 'k', 1, np.where(units == 'm', 2, 0))
+    unit_factors = np.choose(unit_codes, [_UNIT_FACTORS[''], _UNIT_FACTORS['k'], _UNIT_FACTORS['m']])
+    values = pd.Series(np.round(matches[0].to_numpy(dtype=float) * unit_factors, 2), index=matches.index)
+
+    # The first two numbers give the range, which is also what the frequency is guessed from
+    by_match = values.unstack().reindex(columns=[0, 1])
+    min_salary = by_match[0]
+    max_salary = by_match[1].fillna(min_salary)
+
+    salary_strings = salary_strings.loc[by_match.index]
+    keywords = salary_strings.str.extract(_FREQUENCY_RE)
+    found = keywords.notna().to_numpy()
+    frequency = np.select(
+        [found.any(axis=1),
+         np.maximum(min_salary, max_salary) <= 500,  # logical assumption
+         np.minimum(min_salary, max_salary) >= 35000],  # logical assumption
+        [keywords.columns[found.argmax(axis=1)], 'hourly', 'yearly'],
+        default='monthly')
+
+    parsed = pd.DataFrame({'min_salary': min_salary.astype(np.float64), 'max_salary': max_salary.astype(np.float64),
+                           'frequency': pd.Categorical(frequency, categories=_FREQUENCIES)}, index=by_match.index)
+    parsed = parsed.reindex(range(len(salaries)))
+    parsed.index = salaries.index
+    return parsed
     
 
 def calculate_annual_compensation(row: pd.Series, bound: str) -> float:
@@ -159,33 +253,53 @@ def calculate_annual_compensation(row: pd.Series, bound: str) -> float:
     >>> pd.testing.assert_series_equal(expected_result, result)
     """
     try:
-        if row['frequency'] == 'hourly':
-            return row[bound + '_salary'] * 40 * 4 * 12
-        elif row['frequency'] == 'monthly':
-            return row[bound + '_salary'] * 12
-        return row[bound + '_salary']
+        return row[bound + '_salary'] * _FREQ_MULT.get(row['frequency'], 1)
     except ValueError:
         print("inavalid value")
 
 
-def calc_min_comp(row: pd.Series) -> float:
+def annualize(df: pd.DataFrame, bound: str) -> np.ndarray:
     """
-    Calculates the minimum annual compensation based on the given row.
+    Calculates the annual compensation for every row of the given dataframe at once.
 
-    :param row: pd.Series: row of a pandas DataFrame containing salary information
-    :return: float: calculated minimum annual compensation
+    :param df: pd.DataFrame: dataframe containing 'frequency' and the 'min_salary'/'max_salary' columns
+    :param bound: str: 'min' or 'max' depending on the type of compensation to calculate
+    :return: np.ndarray: calculated annual compensation for each row
+
+    >>> df = pd.DataFrame({'frequency':['hourly', 'monthly', 'yearly'], 'min_salary':[55.0, 15000.0, 148000.0], 'max_salary':[60.0, 17000.0, 155000.0]})
+    >>> annualize(df, 'min')
+    array([105600., 180000., 148000.])
+    >>> annualize(df, 'max')
+    array([115200., 204000., 155000.])
+    >>> annualize(pd.DataFrame({'frequency':['weekly', None], 'min_salary':[2000.0, 100.0]}), 'min')
+    array([96000.,   100.])
     """
-    return calculate_annual_compensation(row, 'min')
+    salary = df[bound + '_salary'].to_numpy(dtype=float)
+    frequency = df['frequency'].astype('category')
+    # One multiplier per category, plus a trailing 1 picked up by the -1 code of missing frequencies
+    multipliers = np.array([_FREQ_MULT.get(category, 1) for category in frequency.cat.categories] + [1])
+    return salary * multipliers[frequency.cat.codes.to_numpy()]
 
 
-def calc_max_comp(row: pd.Series) -> float:
+def build_salary_columns(salaries: pd.Series) -> pd.DataFrame:
     """
-    Calculates the maximum annual compensation based on the given row.
+    Derives all the salary columns from a column of salary strings in one vectorized pass: the salary range, the
+    payment frequency and the minimum and maximum annual compensation.
 
-    :param row: pd.Series: row of a pandas DataFrame containing salary information
-    :return: float: calculated maximum annual compensation
+    :param salaries: pd.Series: column of strings containing salary data
+    :return: pd.DataFrame: dataframe with 'min_salary', 'max_salary', 'frequency', 'min_annual_comp' and
+    'max_annual_comp' columns, indexed like salaries
+
+    >>> build_salary_columns(pd.Series(['$345k-$450k annual', '$50-$55', 'depends']))
+       min_salary  max_salary frequency  min_annual_comp  max_annual_comp
+    0    345000.0    450000.0    yearly         345000.0         450000.0
+    1        50.0        55.0    hourly          96000.0         105600.0
+    2         NaN         NaN       NaN              NaN              NaN
     """
-    return calculate_annual_compensation(row, 'max')
+    salary_columns = parse_salaries_column(salaries)
+    salary_columns['min_annual_comp'] = annualize(salary_columns, 'min')
+    salary_columns['max_annual_comp'] = annualize(salary_columns, 'max')
+    return salary_columns
 
 
 def separate_skills(df: pd.DataFrame) -> list[pd.DataFrame]:
@@ -196,43 +310,20 @@ def separate_skills(df: pd.DataFrame) -> list[pd.DataFrame]:
     :return: list[pd.DataFrame]: list containing the job dataframe without the skill column, skill dataframe and
     connecting dataframe.
     """
-    all_skill_list = ['Azure AD',
-                      '.net', ' oauth', ' valet key', ' api', ' azure AD',
-                      'AAA game engine experience', ' C/C++ programming', ' BS CS/CE',
-                      'Azure', ' Active Directory',
-                      'SSO', ' SAML', ' OAuth', ' OpenID',
-                      'Window', ' AD', ' SCCM', ' ServiceNow', ' IT infrastructure', ' DHCP', ' DNS',
-                      'Python', ' PHP', ' MySQL', ' SDLC',
-                      'ASP', ' .NET', ' SQL',
-                      'JavaScript', ' HTML', ' SQL', ' .Net', ' C#', ' CSS', ' J2EE', ' Java',
-                      'Research', ' Test', ' A/V', ' Assembly', ' Python', ' Perl', ' Bash', ' JavaScript', ' Java',
-                      ' PHP', ' Windows', ' UNIX', ' Linux', ' Excel', ' PowerPoint', ' SAS',
-                      'Oracle', ' MySQL', ' SQL',
-                      'IT', ' Biometrics', ' DNA', ' Project Manager', ' SDLC', ' Test', ' J2EE', ' C#',
-                      'Automotive', ' API', ' Ruby on Rails', ' Swift', ' Kotlin', ' Release', ' Java', ' API',
-                      ' MySQL', ' Apache', ' Unity', ' Unreal Engine', ' OpenGL', ' DirectX',
-                      'Machine Learning', ' Deep Learning', ' Natural Language Processing', ' Computer Vision',
-                      ' Data Science', ' Big Data', ' Hadoop', ' Spark', ' Cassandra', ' MongoDB', ' Elasticsearch',
-                      ' Redis', ' RabbitMQ',
-                      'Git', ' Jenkins', ' Ansible', ' Puppet', ' Chef', ' Nagios', ' New Relic', ' Splunk', ' Grafana',
-                      ' Prometheus', ' ELK Stack', ' Apache Kafka',
-                      'RESTful APIs', ' GraphQL', ' WebSockets', ' OAuth 2.0', ' OpenID Connect', ' SAML 2.0', ' JWT',
-                      'OAuth2/OIDC libraries']
-    all_skill_list = list(map(lambda x: x.strip().lower(), all_skill_list))
     skills_dict = {}
-    connecting_df = pd.DataFrame(columns=['job_id', 'skill'])
-    for idx, row in df.skills.iteritems():
-        if pd.notna(row):
-            skills = row.split(',')
-            skills = list(map(lambda x: x.strip().lower(), skills))
-            for skill in skills:
-                if skill in all_skill_list:
-                    skills_dict[skill] = skills_dict.get(skill, 0) + 1
-                    connecting_df = pd.concat(
-                        [connecting_df, pd.DataFrame.from_dict({'job_id': [idx], 'skill': [skill]})],
-                        ignore_index=True, axis=0)
+    job_ids, job_skills = [], []
+    for idx, row in df.skills.dropna().items():
+        skills = row.split(',')
+        skills = list(map(lambda x: x.strip().lower(), skills))
+        for skill in skills:
+            if skill in ALL_SKILLS:
+                skills_dict[skill] = skills_dict.get(skill, 0) + 1
+                job_ids.append(idx)
+                job_skills.append(skill)
     skills_dict = {'skill': skills_dict.keys(), 'frequency': skills_dict.values()}
     skills_df = pd.DataFrame(skills_dict)
+    # Built once from the collected lists so 'job_id' keeps the integer dtype of the job index
+    connecting_df = pd.DataFrame({'job_id': job_ids, 'skill': job_skills}, columns=['job_id', 'skill'])
     return df.drop('skills', axis=1), skills_df, connecting_df
 
 